@@ -1,123 +1,253 @@
-import json
 import os
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import NamedTuple
+import numpy as np
+import orjson
 import pandas as pd
+import matplotlib
+
+# Render off-screen unless INTERACTIVE=1, so batch runs only write the PNGs.
+INTERACTIVE = os.environ.get('INTERACTIVE') == '1'
+if not INTERACTIVE:
+    matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 
-def get_word_count_for_passage(passage, bible_data, day_for_logging):
+# Bump whenever the structure returned by load_bible() changes, so stale caches are rebuilt.
+BIBLE_CACHE_VERSION = 4
+
+def build_cumulative_counts(verses):
     """
-    Calculates the word count for a single passage, with verse-level precision.
-    
+    Builds a cumulative word-count table for one chapter.
+
+    Args:
+        verses (list): (verse_num, word_count) pairs for the chapter.
+
+    Returns:
+        np.ndarray: int32 array where cum[v] is the number of words in verses 1..v,
+            so the words in verses a..b are cum[b] - cum[a - 1].
+    """
+    # A chapter with no verses gets a one-element table, so it counts as 0 words
+    counts = np.zeros(max((verse_num for verse_num, _ in verses), default=0) + 1, dtype=np.int32)
+    for verse_num, word_count in verses:
+        counts[verse_num] += word_count  # Repeated verse numbers are summed, as the baseline scan did
+    return np.cumsum(counts, dtype=np.int32)
+
+def load_book(path):
+    """
+    Loads one book JSON file and reduces it to cumulative verse word counts.
+
+    Args:
+        path (str): Path of the book JSON file.
+
+    Returns:
+        dict: {chapter: cumulative word-count array}, see build_cumulative_counts().
+    """
+    with open(path, 'rb') as f:
+        book = orjson.loads(f.read())
+    return {
+        chapter['chapter']: build_cumulative_counts(
+            [(v['verse'], len(v['text'].split())) for v in chapter['verses']]
+        )
+        for chapter in book['chapters']
+    }
+
+def load_bible(cache='bible.pkl', bible_path='Bible-kjv-1611'):
+    """
+    Loads cumulative verse word counts for every book, using an on-disk pickle cache.
+
+    The raw book JSON files are only parsed when the cache is missing, unreadable
+    or older than any book file, in which case the books are loaded in parallel
+    threads; the verse text is discarded once counted.
+
+    Args:
+        cache (str): Path of the pickle cache file.
+        bible_path (str): Directory containing one JSON file per book.
+
+    Returns:
+        dict: {book: {chapter: cumulative word-count array}}, see build_cumulative_counts().
+    """
+    book_names = [
+        os.path.splitext(filename)[0] for filename in os.listdir(bible_path)
+        if filename.endswith('.json') and os.path.splitext(filename)[0] not in ["Books", "Books_chapter_count"]
+    ]
+    paths = [os.path.join(bible_path, f"{book_name}.json") for book_name in book_names]
+
+    # Editing a book in place doesn't touch the directory mtime, so check every book file too
+    newest_source = max([os.path.getmtime(bible_path)] + [os.path.getmtime(p) for p in paths])
+    if os.path.exists(cache) and os.path.getmtime(cache) >= newest_source:
+        try:
+            with open(cache, 'rb') as f:
+                version, bible_data = pickle.load(f)
+            if version == BIBLE_CACHE_VERSION:
+                return bible_data
+        except Exception:
+            pass  # Damaged or unreadable cache (e.g. written by another numpy version); rebuild it below
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        bible_data = dict(zip(book_names, pool.map(load_book, paths)))
+
+    # Write to a temporary file first so an interrupted run never leaves a partial cache
+    with open(cache + '.tmp', 'wb') as f:
+        pickle.dump((BIBLE_CACHE_VERSION, bible_data), f, protocol=5)
+    os.replace(cache + '.tmp', cache)
+
+    return bible_data
+
+class PassageSpec(NamedTuple):
+    """
+    A parsed plan passage. The verse range only applies to the last chapter;
+    any earlier chapters in a chapter range are read in full.
+    """
+    book: str
+    chap_start: int
+    chap_end: int
+    verse_start: int
+    verse_end: int  # -1 means "to the end of the chapter"
+    passage: str  # The original reference, for logging
+
+@lru_cache(maxsize=None)
+def parse_passage(passage):
+    """
+    Parses a passage reference into a PassageSpec. Results are memoized, since
+    the same reference can appear more than once in the plan.
+
     Args:
         passage (str): The passage reference, e.g., "Genesis 1", "Mark 11:3ff".
-        bible_data (dict): The dictionary containing all Bible book data.
-        day_for_logging (str): The day identifier ("MMDD") for logging errors.
 
     Returns:
-        int: The total word count for the passage.
+        PassageSpec: The parsed book, chapter range and verse range.
+
+    Raises:
+        ValueError: If the reference cannot be parsed.
     """
-    try:
-        book, reference_str = passage.rsplit(' ', 1)
-        book = book.strip()
-        reference_str = reference_str.strip()
+    book, reference_str = passage.rsplit(' ', 1)
+    book = book.strip()
+    reference_str = reference_str.strip()
 
-        if book not in bible_data:
-            print(f"On day {day_for_logging}: Book '{book}' not found. (From passage: '{passage}')")
-            return 0
-        
-        book_content = bible_data[book]['chapters']
-        word_count = 0
+    # Split reference into chapter and verse parts
+    if ':' in reference_str:
+        chapter_part, verse_part = reference_str.split(':', 1)
+    else:
+        chapter_part, verse_part = reference_str, None
 
-        # --- Main Parsing Logic ---
+    # --- Parse Chapters ---
+    if '-' in chapter_part:
+        chap_start, chap_end = map(int, chapter_part.split('-'))
+    else:
+        chap_start = chap_end = int(chapter_part)
 
-        # Split reference into chapter and verse parts
-        if ':' in reference_str:
-            chapter_part, verse_part = reference_str.split(':', 1)
+    # --- Parse Verses (default is the entire chapter) ---
+    verse_start, verse_end = 1, -1
+    if verse_part:
+        if 'ff' in verse_part:
+            verse_start = int(verse_part.replace('ff', ''))
+        elif '-' in verse_part:
+            verse_start, verse_end = map(int, verse_part.split('-'))
         else:
-            chapter_part, verse_part = reference_str, None
+            verse_start = verse_end = int(verse_part)
 
-        # --- Parse Chapters ---
-        chapters_to_process = []
-        if '-' in chapter_part:
-            start_c, end_c = map(int, chapter_part.split('-'))
-            chapters_to_process = list(range(start_c, end_c + 1))
-        else:
-            chapters_to_process = [int(chapter_part)]
-        
-        # --- Iterate Over Chapters and Count Words ---
-        for i, chap_num in enumerate(chapters_to_process):
-            # Default verse range is the entire chapter
-            start_v, end_v = 1, -1  # -1 will be replaced with the last verse number
-
-            # Check if the verse part of the reference applies to the current chapter
-            # It only applies if it's a single-chapter reference or the last chapter in a range
-            is_last_chapter_in_range = (i == len(chapters_to_process) - 1)
-            if verse_part and is_last_chapter_in_range:
-                if 'ff' in verse_part:
-                    start_v = int(verse_part.replace('ff', ''))
-                    end_v = -1  # Signifies to the end of the chapter
-                elif '-' in verse_part:
-                    start_v, end_v = map(int, verse_part.split('-'))
-                else:
-                    start_v = end_v = int(verse_part)
-            
-            # Get the chapter data from the loaded bible JSON
-            chapter_data = next((c for c in book_content if c['chapter'] == chap_num), None)
-            if not chapter_data:
-                print(f"On day {day_for_logging}: Chapter {chap_num} not found in book '{book}'.")
-                continue
-
-            # Find the actual last verse number if needed
-            last_verse_in_chapter = len(chapter_data['verses'])
-            if end_v == -1:
-                end_v = last_verse_in_chapter
-            
-            # Sum the words for each verse in the calculated range
-            for verse_obj in chapter_data['verses']:
-                if start_v <= verse_obj['verse'] <= end_v:
-                    word_count += len(verse_obj['text'].split())
-        
-        return word_count
-
-    except Exception as e:
-        print(f"On day {day_for_logging}: Error processing passage '{passage}'. Details: {e}")
+    return PassageSpec(book, chap_start, chap_end, verse_start, verse_end, passage)
+
+def load_plan(plan_path='RMM-plan.json'):
+    """
+    Loads the McCheyne reading plan and parses every passage up front.
+
+    Args:
+        plan_path (str): Path of the reading plan JSON file.
+
+    Returns:
+        dict: {day ("MMDD"): [PassageSpec, ...]} covering the family and secret readings.
+    """
+    with open(plan_path, 'rb') as f:
+        plan = orjson.loads(f.read())
+
+    parsed_plan = {}
+    for day, readings in plan.items():
+        specs = []
+        for reading_type in ['family', 'secret']:
+            for passage in readings[reading_type]:
+                try:
+                    specs.append(parse_passage(passage))
+                except ValueError as e:
+                    print(f"On day {day}: Error parsing passage '{passage}'. Details: {e}")
+        parsed_plan[day] = specs
+
+    return parsed_plan
+
+def word_count_for_spec(spec, bible_data, day_for_logging):
+    """
+    Calculates the word count for a single parsed passage, with verse-level precision.
+
+    Args:
+        spec (PassageSpec): The parsed passage, from parse_passage().
+        bible_data (dict): Cumulative verse word counts for every book, from load_bible().
+        day_for_logging (str): The day identifier ("MMDD") for logging errors.
+
+    Returns:
+        int: The total word count for the passage.
+    """
+    book_content = bible_data.get(spec.book)
+    if book_content is None:
+        print(f"On day {day_for_logging}: Book '{spec.book}' not found. (From passage: '{spec.passage}')")
         return 0
 
+    word_count = 0
+    for chap_num in range(spec.chap_start, spec.chap_end + 1):
+        cum = book_content.get(chap_num)
+        if cum is None:
+            print(f"On day {day_for_logging}: Chapter {chap_num} not found in book '{spec.book}'.")
+            continue
+
+        # The verse range only applies to the last chapter in the range
+        last_verse_in_chapter = len(cum) - 1
+        if chap_num == spec.chap_end:
+            start_v, end_v = max(spec.verse_start, 1), spec.verse_end
+            if end_v == -1 or end_v > last_verse_in_chapter:
+                end_v = last_verse_in_chapter
+        else:
+            start_v, end_v = 1, last_verse_in_chapter
+
+        # Words in the verse range are the difference of two cumulative sums
+        if start_v <= end_v:
+            word_count += int(cum[end_v] - cum[start_v - 1])
+
+    return word_count
+
 def calculate_daily_word_counts():
     """
     Parses the McCheyne reading plan and the Bible text to calculate
     the total number of words to be read each day.
+
+    Returns:
+        pd.DataFrame: 'Day' ("MMDD") and 'WordCount' (int32) columns, in plan order.
     """
-    with open('RMM-plan.json', 'r') as f:
-        plan = json.load(f)
+    plan = load_plan()
+    bible_data = load_bible()
 
-    bible_path = 'Bible-kjv-1611'
-    bible_data = {}
-    for filename in os.listdir(bible_path):
-        if filename.endswith('.json'):
-            book_name = os.path.splitext(filename)[0]
-            if book_name not in ["Books", "Books_chapter_count"]:
-                with open(os.path.join(bible_path, filename), 'r') as f:
-                    bible_data[book_name] = json.load(f)
+    days = np.empty(len(plan), dtype='U4')
+    counts = np.empty(len(plan), dtype=np.int32)
+    for i, (day, specs) in enumerate(plan.items()):
+        days[i] = day
+        counts[i] = sum(word_count_for_spec(spec, bible_data, day) for spec in specs)
 
-    daily_word_counts = {}
-    for day, readings in plan.items():
-        total_words_today = 0
-        for reading_type in ['family', 'secret']:
-            for passage in readings[reading_type]:
-                total_words_today += get_word_count_for_passage(passage, bible_data, day)
-        daily_word_counts[day] = total_words_today
-
-    return daily_word_counts
+    return pd.DataFrame({'Day': days, 'WordCount': counts})
 
-def main():
+def main(export_csv=False):
     """
     Main function to execute the analysis, generate plots, and print statistics.
+
+    Args:
+        export_csv (bool): Also write daily_word_counts.csv for human inspection.
     """
-    daily_word_counts = calculate_daily_word_counts()
-    df = pd.DataFrame(list(daily_word_counts.items()), columns=['Day', 'WordCount'])
+    df = calculate_daily_word_counts()
 
-    df.to_csv('daily_word_counts.csv', index=False)
-    print("Daily word counts saved to daily_word_counts.csv")
+    df.to_parquet('daily_word_counts.parquet', index=False)
+    print("Daily word counts saved to daily_word_counts.parquet")
+    if export_csv:
+        df.to_csv('daily_word_counts.csv', index=False)
+        print("Daily word counts saved to daily_word_counts.csv")
 
     plt.figure(figsize=(12, 6))
     plt.hist(df['WordCount'], bins=30, edgecolor='black', alpha=0.7)
@@ -129,11 +259,13 @@ def main():
     plt.savefig('word_count_distribution.png')
     print("Distribution plot saved to word_count_distribution.png")
     
-    plt.show()
+    if INTERACTIVE:
+        plt.show()
+    plt.close()
 
     print("\n--- Summary Statistics for Daily Word Counts (Verse Accurate) ---")
     valid_word_counts = df[df['WordCount'] > 0]['WordCount']
     print(valid_word_counts.describe())
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main(export_csv=os.environ.get('EXPORT_CSV') == '1')
\ No newline at end of file
@@ -1,20 +1,42 @@
+import os
 import pandas as pd
+import matplotlib
+
+INTERACTIVE = os.environ.get('INTERACTIVE') == '1'
+if not INTERACTIVE:
+    matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import seaborn as sns
 from scipy import stats
 import numpy as np
 
-def perform_extended_analysis(csv_filepath='daily_word_counts.csv'):
+def add_date_columns(df):
+    """
+    Adds 'Date' and 'Month' columns derived from the "MMDD" 'Day' column.
+    We assume a non-leap year; the specific year doesn't matter for this analysis.
     """
-    Loads the daily word count data and performs extended statistical analysis.
+    df['Date'] = pd.to_datetime('2025' + df['Day'].astype(str).str.zfill(4), format='%Y%m%d')
+    df['Month'] = df['Date'].dt.month_name()
+    return df
+
+def load_daily_word_counts(parquet_filepath='daily_word_counts.parquet'):
+    """
+    Loads the daily word count data once, for both analysis passes.
+    Returns None if the file has not been generated yet.
     """
     try:
-        df = pd.read_csv(csv_filepath)
+        return pd.read_parquet(parquet_filepath)
     except FileNotFoundError:
-        print(f"Error: The file '{csv_filepath}' was not found.")
-        print("Please run your main script first to generate the CSV file.")
-        return
+        print(f"Error: The file '{parquet_filepath}' was not found.")
+        print("Please run your main script first to generate the Parquet file.")
+        return None
 
+def perform_extended_analysis(df):
+    """
+    Performs extended statistical analysis on the daily word count data.
+    The 'Date' and 'Month' columns are added to `df` in place, so
+    perform_advanced_analysis can reuse them.
+    """
     print("--- Extended Statistical Analysis ---")
 
     # --- 1. Time Series Analysis: Rolling Average ---
@@ -31,13 +53,13 @@ def perform_extended_analysis(csv_filepath='daily_word_counts.csv'):
     plt.grid(True, linestyle='--', alpha=0.6)
     plt.savefig('rolling_average_plot.png')
     print("\n[+] A plot showing the 7-day rolling average has been saved to 'rolling_average_plot.png'")
-    plt.show()
+    if INTERACTIVE:
+        plt.show()
+    plt.close()
 
     # --- 2. Monthly Reading Load Analysis ---
     # We create a proper date to extract month names for grouping.
-    # We'll assume a non-leap year; the specific year doesn't matter for this analysis.
-    df['Date'] = pd.to_datetime('2025' + df['Day'].astype(str).str.zfill(4), format='%Y%m%d')
-    df['Month'] = df['Date'].dt.month_name()
+    add_date_columns(df)
     
     month_order = ['January', 'February', 'March', 'April', 'May', 'June', 
                    'July', 'August', 'September', 'October', 'November', 'December']
@@ -52,7 +74,9 @@ def perform_extended_analysis(csv_filepath='daily_word_counts.csv'):
     plt.tight_layout()
     plt.savefig('monthly_word_count_boxplot.png')
     print("\n[+] A boxplot showing word count distributions per month has been saved as 'monthly_word_count_boxplot.png'")
-    plt.show()
+    if INTERACTIVE:
+        plt.show()
+    plt.close()
 
     # --- 3. Distribution and Normality Test ---
     # This formally tests if the word count distribution is "normal" (a bell curve).
@@ -95,30 +119,41 @@ def gini(x):
     index = np.arange(1, n + 1)
     return (np.sum((2 * index - n - 1) * sorted_x)) / (n * np.sum(sorted_x))
 
-def perform_advanced_analysis(csv_filepath='daily_word_counts.csv'):
+def grouped_gini(df, group_col, value_col):
+    """
+    Calculates the Gini coefficient of `value_col` for every group in `group_col`.
+
+    Equivalent to df.groupby(group_col)[value_col].apply(gini), but computed for
+    all groups at once from a single sort instead of a Python call per group.
     """
-    Loads the daily word count data and performs advanced analysis,
+    sorted_df = df[[group_col, value_col]].sort_values(by=[group_col, value_col])
+    grouped = sorted_df.groupby(group_col)[value_col]
+    rank = grouped.cumcount() + 1
+    n = grouped.transform('size')
+    total = grouped.transform('sum')
+
+    weighted = ((2 * rank - n - 1) * sorted_df[value_col]).groupby(sorted_df[group_col]).sum()
+    denominator = (n * total).groupby(sorted_df[group_col]).first()
+    # Gini is 0 for all-zero groups
+    return (weighted / denominator.where(denominator != 0)).fillna(0)
+
+def perform_advanced_analysis(df):
+    """
+    Performs advanced analysis on the daily word count data,
     including Gini coefficient and a "Reading Challenge Score".
+    Date columns already added by perform_extended_analysis are reused.
     """
-    try:
-        df = pd.read_csv(csv_filepath)
-    except FileNotFoundError:
-        print(f"Error: The file '{csv_filepath}' was not found.")
-        print("Please run your main script first to generate the CSV file.")
-        return
-
     print("--- Advanced Statistical Analysis ---")
 
     # --- Setup: Create Date-based columns ---
-    # Assume a non-leap year. The year itself is arbitrary.
-    df['Date'] = pd.to_datetime('2025' + df['Day'].astype(str).str.zfill(4), format='%Y%m%d')
-    df['Month'] = df['Date'].dt.month_name()
+    if 'Date' not in df.columns:
+        add_date_columns(df)
     df = df.sort_values(by='Date').reset_index(drop=True)
     month_order = ['January', 'February', 'March', 'April', 'May', 'June', 
                    'July', 'August', 'September', 'October', 'November', 'December']
 
     # --- 1. Gini Coefficient by Month (Reading Load Inequality) ---
-    monthly_gini = df.groupby('Month')['WordCount'].apply(gini).loc[month_order]
+    monthly_gini = grouped_gini(df, 'Month', 'WordCount').loc[month_order]
     
     plt.figure(figsize=(12, 6))
     monthly_gini.plot(kind='bar', color=sns.color_palette("plasma", 12))
@@ -130,7 +165,9 @@ def perform_advanced_analysis(csv_filepath='daily_word_counts.csv'):
     plt.tight_layout()
     plt.savefig('monthly_gini_plot.png')
     print("\n[+] A plot of the monthly Gini coefficient has been saved to 'monthly_gini_plot.png'")
-    plt.show()
+    if INTERACTIVE:
+        plt.show()
+    plt.close()
     print("Interpretation: A higher bar means the daily word counts within that month are more unequal.")
 
 
@@ -138,8 +175,9 @@ def perform_advanced_analysis(csv_filepath='daily_word_counts.csv'):
     window = 14 # Use a 14-day window to assess difficulty
     
     # Calculate rolling volume (mean) and volatility (standard deviation)
-    df['Volume'] = df['WordCount'].rolling(window=window, center=True).mean()
-    df['Volatility'] = df['WordCount'].rolling(window=window, center=True).std()
+    roller = df['WordCount'].rolling(window=window, center=True)
+    df['Volume'] = roller.mean()
+    df['Volatility'] = roller.std()
     
     # Normalize by the overall mean/std to create a comparable score
     df['Challenge_Score'] = (df['Volume'] / df['WordCount'].mean()) + (df['Volatility'] / df['WordCount'].std())
@@ -156,7 +194,9 @@ def perform_advanced_analysis(csv_filepath='daily_word_counts.csv'):
     plt.tight_layout()
     plt.savefig('reading_challenge_score.png')
     print("\n[+] A plot of the 'Reading Challenge Score' has been saved to 'reading_challenge_score.png'")
-    plt.show()
+    if INTERACTIVE:
+        plt.show()
+    plt.close(fig)
 
     # Identify the most challenging period
     most_challenging_date = df.loc[df['Challenge_Score'].idxmax()]['Date']
@@ -172,5 +212,7 @@ def perform_advanced_analysis(csv_filepath='daily_word_counts.csv'):
 
 
 if __name__ == '__main__':
-    perform_extended_analysis()
-    perform_advanced_analysis()
\ No newline at end of file
+    df = load_daily_word_counts()
+    if df is not None:
+        perform_extended_analysis(df)
+        perform_advanced_analysis(df)
\ No newline at end of file